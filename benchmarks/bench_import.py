@@ -0,0 +1,63 @@
+"""导入耗时基准：在独立子进程中冷启动导入各入口模块，并确认重依赖未被提前加载
+
+用法：python benchmarks/bench_import.py [--repeat 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("selenium", "mutagen", "requests")
+
+TARGETS = [
+    ("cli", "import qqmusic_decryptor.cli"),
+    ("tag 路径", "import qqmusic_decryptor.tagger"),
+    ("daemon 路径", "import qqmusic_decryptor.daemon"),
+    ("参考：selenium", "import selenium.webdriver"),
+    ("参考：mutagen+requests", "import mutagen.flac, mutagen.mp3, mutagen.mp4, requests"),
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - start
+loaded = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{"elapsed": elapsed, "loaded": loaded}}))
+"""
+
+
+def measure(stmt, repeat):
+    code = PROBE.format(stmt=stmt, heavy=HEAVY_MODULES)
+    times, loaded = [], []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        data = json.loads(result.stdout)
+        times.append(data["elapsed"])
+        loaded = data["loaded"]
+    return statistics.median(times), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="入口模块导入耗时基准")
+    parser.add_argument("--repeat", type=int, default=10, help="每个目标重复次数")
+    args = parser.parse_args()
+
+    print(f"{'目标':<24}{'中位耗时(ms)':>14}  已加载的重依赖")
+    for name, stmt in TARGETS:
+        median, loaded = measure(stmt, args.repeat)
+        if median is None:
+            print(f"{name:<24}{'失败':>14}  {loaded}")
+            continue
+        print(f"{name:<24}{median * 1000:>14.1f}  {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""QQ 音乐加密文件解密与标签补全工具
+
+各功能模块按需导入，selenium / mutagen / requests 只在实际用到时加载。
+"""
+
+__version__ = "1.1.0"
@@ -0,0 +1,247 @@
+import os
+import re
+import subprocess
+import time
+
+from . import config
+
+
+# ---------------- 版本检测函数 ----------------
+def get_edge_version():
+    """获取已安装的Edge浏览器版本"""
+    try:
+        result = subprocess.run(['reg', 'query',
+                                 'HKEY_CURRENT_USER\\Software\\Microsoft\\Edge\\BLBeacon',
+                                 '/v', 'version'],
+                                capture_output=True, text=True, timeout=10)
+        if result.returncode == 0:
+            version_match = re.search(r'(\d+\.\d+\.\d+\.\d+)', result.stdout)
+            if version_match:
+                return version_match.group(1)
+    except Exception:
+        pass
+    return "未知"
+
+
+def get_driver_version(driver_path):
+    """获取EdgeDriver版本"""
+    try:
+        if os.path.exists(driver_path):
+            result = subprocess.run([driver_path, '--version'], capture_output=True, text=True, timeout=10)
+            if result.returncode == 0:
+                version_match = re.search(r'(\d+\.\d+\.\d+\.\d+)', result.stdout)
+                if version_match:
+                    return version_match.group(1)
+    except Exception:
+        pass
+    return "未知"
+
+
+def check_driver_compatibility():
+    """检查dist文件夹中的Driver版本，提供明确提示"""
+    edge_version = get_edge_version()
+
+    # 检查dist文件夹中是否有driver文件
+    driver_exists = os.path.exists(config.edge_driver_path)
+
+    if not driver_exists:
+        print("\n❌ 未找到EdgeDriver文件")
+        print("=" * 50)
+        print(f"当前Edge浏览器版本: {edge_version}")
+        print(f"需要下载的Driver版本: 与Edge版本匹配")
+        print("\n📥 请执行以下操作:")
+        print("1. 访问: https://developer.microsoft.com/zh-cn/microsoft-edge/tools/webdriver/")
+        print("2. 下载与您Edge版本匹配的EdgeDriver")
+        print(f"3. 将下载的msedgedriver.exe放在: {os.path.dirname(config.edge_driver_path)}")
+        print("=" * 50)
+        return False
+
+    # 获取driver版本
+    driver_version = get_driver_version(config.edge_driver_path)
+
+    print(f"🔍 版本检查:")
+    print(f"   - Edge浏览器版本: {edge_version}")
+    print(f"   - 当前Driver版本: {driver_version}")
+
+    if edge_version == "未知" or driver_version == "未知":
+        print("⚠️ 无法完成版本检查，请手动确认驱动兼容性")
+        return True
+
+    # 提取主版本号进行比较
+    edge_major = edge_version.split('.')[0]
+    driver_major = driver_version.split('.')[0]
+
+    if edge_major != driver_major:
+        print("\n❌ Driver版本不匹配！")
+        print("=" * 50)
+        print(f"当前Edge版本: {edge_version}")
+        print(f"当前Driver版本: {driver_version}")
+        print(f"主版本号不匹配: Edge v{edge_major} ≠ Driver v{driver_major}")
+        print("\n📥 请执行以下操作:")
+        print("1. 访问: https://developer.microsoft.com/zh-cn/microsoft-edge/tools/webdriver/")
+        print("2. 下载与您Edge版本匹配的EdgeDriver")
+        print(f"3. 替换文件: {os.path.basename(config.edge_driver_path)}")
+        print("=" * 50)
+        return False
+
+    print("✅ 版本兼容性检查通过")
+    return True
+
+
+# ---------------- 解密下载 ----------------
+def setup_browser():
+    if not check_driver_compatibility():
+        print("\n💡 请按照上述提示操作后重新运行程序")
+        exit(1)
+
+    from selenium import webdriver
+    from selenium.webdriver.edge.service import Service as EdgeService
+    from selenium.webdriver.edge.options import Options as EdgeOptions
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    edge_options = EdgeOptions()
+    prefs = {
+        "download.default_directory": config.raw_dir,
+        "download.prompt_for_download": False,
+        "profile.default_content_setting_values.automatic_downloads": 1,
+    }
+    edge_options.add_experimental_option("prefs", prefs)
+
+    try:
+        service = EdgeService(executable_path=config.edge_driver_path)
+        driver = webdriver.Edge(service=service, options=edge_options)
+        return driver, WebDriverWait(driver, 30)
+
+    except Exception as e:
+        print(f"❌ 浏览器启动失败: {e}")
+        print("\n🔧 可能的原因:")
+        print("1. Driver版本与Edge浏览器不匹配")
+        print("2. Driver文件损坏")
+        print("3. 请重新下载正确的Driver版本")
+        exit(1)
+
+
+def wait_for_decryption(driver, wait, file_count, stall_timeout=120):
+    """等待网页解密完成；超过 stall_timeout 秒没有新的解密结果视为卡住"""
+    from selenium.webdriver.common.by import By
+
+    print(f"🔍 正在监测解密进度(0/{file_count})", end="", flush=True)
+    decrypted = 0
+    last_progress = time.time()
+    while decrypted < file_count:
+        rows = driver.find_elements(By.CSS_SELECTOR, '.el-table__body-wrapper tbody tr')
+        current = len(rows)
+        if current > decrypted:
+            decrypted = current
+            last_progress = time.time()
+            print(f"\r🔍 正在监测解密进度({decrypted}/{file_count})", end="", flush=True)
+        if decrypted >= file_count:
+            print("\n✅ 所有文件解密完成！")
+            return True
+        if time.time() - last_progress > stall_timeout:
+            print(f"\n⚠️ 解密超时（{stall_timeout} 秒无进展，完成 {decrypted}/{file_count}）")
+            return False
+        time.sleep(1)
+    return False
+
+
+def wait_for_downloads(file_count, existing=None):
+    """等待下载完成；existing 为下载开始前 raw 目录中已有的文件，不计入进度"""
+    existing = existing or set()
+    print(f"⏬ 正在监测下载进度(0/{file_count})", end="", flush=True)
+    downloaded = set()
+    start_time = time.time()
+    while len(downloaded) < file_count:
+        # 已确认的文件不再重复 stat；DirEntry 在 Windows 上自带大小信息，无需额外系统调用
+        with os.scandir(config.raw_dir) as it:
+            new_files = {
+                entry.name for entry in it
+                if entry.name not in existing and entry.name not in downloaded
+                   and not (entry.name.endswith('.crdownload') or entry.name.endswith('.tmp'))
+                   and entry.is_file() and entry.stat().st_size > 1024
+            }
+        if new_files:
+            downloaded.update(new_files)
+            print(f"\r⏬ 正在监测下载进度({len(downloaded)}/{file_count})", end="", flush=True)
+        if time.time() - start_time > 300:
+            print(f"\n⚠️ 下载超时（完成 {len(downloaded)}/{file_count}）")
+            return False
+        time.sleep(2)
+    print("\n✅ 所有文件下载完成！")
+    return True
+
+
+def decrypt_batch(driver, wait, enc_files):
+    """上传一批加密文件并下载解密结果，成功后删除源文件"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    driver.get("https://unlock-music.lmb520.cn/")
+    print("🌐 网站加载中...")
+
+    file_count = len(enc_files)
+    existing = set(os.listdir(config.raw_dir))
+
+    upload_box = wait.until(EC.presence_of_element_located((By.XPATH, '//input[@type="file"]')))
+    upload_box.send_keys("\n".join(os.path.join(config.input_dir, f) for f in enc_files))
+    print(f"⬆️ 已上传 {file_count} 个文件")
+
+    if not wait_for_decryption(driver, wait, file_count):
+        print("❌ 解密过程异常")
+        return False
+
+    try:
+        download_btn = wait.until(
+            EC.element_to_be_clickable((By.XPATH, '//button[.//span[contains(text(),"下载全部")]]'))
+        )
+        download_btn.click()
+        print("💾 已触发批量下载")
+    except Exception as e:
+        print(f"❌ 下载按钮点击失败: {e}")
+        return False
+
+    if not wait_for_downloads(file_count, existing):
+        print("⚠️ 下载未全部完成")
+
+    for f in enc_files:
+        try:
+            os.remove(os.path.join(config.input_dir, f))
+        except Exception as e:
+            print(f"⚠️ 删除失败 {f}: {e}")
+    return True
+
+
+def decrypt_all():
+    """分批解密源目录中的全部加密文件，返回是否可以继续补全标签"""
+    from .scan import iter_files
+
+    def chunks():
+        chunk = []
+        for rel, _ in iter_files(config.input_dir, config.enc_exts, recursive=config.recursive,
+                                 workers=config.scan_workers, skip=(config.raw_dir, config.done_dir)):
+            chunk.append(rel)
+            if len(chunk) >= config.upload_batch:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    driver, wait = None, None
+    found, succeeded = 0, 0
+    try:
+        # 每批最多 upload_batch 个文件，避免一次拼接、上传整个目录树
+        for chunk in chunks():
+            found += len(chunk)
+            print(f"📂 发现 {len(chunk)} 个待处理文件（累计 {found}）")
+            if driver is None:
+                driver, wait = setup_browser()
+            if decrypt_batch(driver, wait, chunk):
+                succeeded += len(chunk)
+    finally:
+        if driver is not None:
+            driver.quit()
+            print("🚫 浏览器已关闭")
+
+    if not found:
+        print("❌ 未找到加密文件（.mflac/.mmp4/.mgg）")
+    return succeeded > 0
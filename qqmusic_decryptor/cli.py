@@ -0,0 +1,190 @@
+import argparse
+import os
+import sys
+
+from . import config
+
+
+def add_common_arguments(parser, suppress=False):
+    """子命令使用 SUPPRESS 默认值，避免覆盖写在子命令之前的同名参数"""
+    def default(value):
+        return argparse.SUPPRESS if suppress else value
+
+    parser.add_argument("--source", default=default(config.default_source_dir),
+                        help="源目录 (存放加密文件：.mflac/.mmp4/.mgg)")
+    parser.add_argument("--raw", default=default(config.default_raw_dir), help="解密输出目录")
+    parser.add_argument("--done", default=default(config.default_done_dir), help="最终处理目录")
+    parser.add_argument("--driver", default=default(config.default_driver_path), help="EdgeDriver 路径")
+    parser.add_argument("--threads", type=int, default=default(config.max_workers), help="并行处理线程数")
+    parser.add_argument("--no-recursive", action="store_true", default=default(False),
+                        help="只扫描目录本身，不进入子目录")
+    parser.add_argument("--scan-workers", type=int, default=default(config.scan_workers),
+                        help="并行扫描子目录的线程数")
+    parser.add_argument("--max-inflight", type=int, default=default(config.max_inflight),
+                        help="同时排队的任务数上限（0 表示线程数的 4 倍）")
+    parser.add_argument("--max-memory-mb", type=int, default=default(config.max_memory_mb),
+                        help="内存上限（MB），超出时暂停提交并清理缓存，0 表示不限制")
+    parser.add_argument("--cache-entries", type=int, default=default(config.cache_entries),
+                        help="元数据、专辑、封面地址缓存各自的条目上限")
+    parser.add_argument("--report", default=default(config.report_path),
+                        help="JSONL 结果报告路径（默认写入 reports 目录）")
+    parser.add_argument("--upload-batch", type=int, default=default(config.upload_batch),
+                        help="每次上传解密的文件数")
+    parser.add_argument("--lyrics", action="store_true", default=default(False),
+                        help="获取 LRC 歌词并与其他标签一起写入")
+    parser.add_argument("--lyrics-cache", default=default(config.lyrics_cache_path),
+                        help="歌词缓存文件路径")
+    parser.add_argument("--dedup", choices=("off", "skip", "link"), default=default(config.dedup),
+                        help="重复文件处理：off 不检测，skip 跳过，link 在完成目录中硬链接到已有文件")
+    parser.add_argument("--dedup-fingerprint", action="store_true", default=default(False),
+                        help="同时按歌手、标题、时长识别不同编码的同一首歌")
+    parser.add_argument("--dedup-db", default=default(config.dedup_db_path), help="去重索引数据库路径")
+    parser.add_argument("--cover-size", type=int, default=default(config.cover_size),
+                        help="封面缩放到的最大边长（像素，0 表示保持原图，需要 Pillow）")
+    parser.add_argument("--cover-max-kb", type=int, default=default(config.cover_max_kb),
+                        help="封面大小上限（KB，0 表示不限制，需要 Pillow）")
+    parser.add_argument("--cover-cache-mb", type=int, default=default(config.cover_cache_mb),
+                        help="内存中封面缓存的总大小上限（MB），超出时淘汰最久未用的专辑")
+
+
+def add_daemon_arguments(parser, suppress=False):
+    def default(value):
+        return argparse.SUPPRESS if suppress else value
+
+    parser.add_argument("--batch-size", type=int, default=default(config.batch_size),
+                        help="守护模式：累计多少个文件立即处理一批")
+    parser.add_argument("--batch-ms", type=int, default=default(config.batch_ms),
+                        help="守护模式：首个文件到达后最多等待多少毫秒处理一批")
+    parser.add_argument("--poll-ms", type=int, default=default(config.poll_ms),
+                        help="守护模式：目录轮询间隔（毫秒）")
+    parser.add_argument("--status-port", type=int, default=default(config.status_port),
+                        help="守护模式：本地状态接口端口（0 表示关闭）")
+
+
+def add_cluster_arguments(parser, worker=False):
+    parser.add_argument("--queue", default=argparse.SUPPRESS,
+                        help="共享队列数据库路径（默认为解密目录下的 .qqmusic_queue.sqlite3）")
+    if worker:
+        parser.add_argument("--lease-seconds", type=int, default=argparse.SUPPRESS,
+                            help=f"任务租约时长（秒，默认 {config.lease_seconds}），节点崩溃后超时由其他节点接手")
+        parser.add_argument("--max-attempts", type=int, default=argparse.SUPPRESS,
+                            help=f"同一文件最多被领取的次数（默认 {config.max_attempts}）")
+        parser.add_argument("--enqueue", action="store_true", default=argparse.SUPPRESS,
+                            help="启动时先扫描解密目录并入队")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="自动解密 QQ 音乐加密文件并补全标签")
+    add_common_arguments(parser)
+    add_daemon_arguments(parser)
+    parser.add_argument("--daemon", action="store_true", help="守护模式（等同于 daemon 子命令）")
+
+    commands = {
+        "run": "解密并补全标签（默认）",
+        "decrypt": "仅解密源目录中的加密文件",
+        "tag": "仅补全解密目录中文件的标签",
+        "daemon": "守护模式：持续监听 --source 与 --raw 目录",
+        "enqueue": "多节点：扫描解密目录，把文件加入共享队列",
+        "worker": "多节点：从共享队列领取文件并在本机补全标签",
+        "merge-report": "多节点：合并各节点的处理结果",
+    }
+    subparsers = parser.add_subparsers(dest="command", metavar="{" + ",".join(commands) + "}")
+    for name, help_text in commands.items():
+        sub = subparsers.add_parser(name, help=help_text, description=help_text)
+        add_common_arguments(sub, suppress=True)
+        if name == "daemon":
+            add_daemon_arguments(sub, suppress=True)
+        if name in ("enqueue", "worker", "merge-report"):
+            add_cluster_arguments(sub, worker=name == "worker")
+    return parser
+
+
+def prepare_dirs():
+    # 检查目录是否存在，如果不存在则创建
+    os.makedirs(config.input_dir, exist_ok=True)
+    os.makedirs(config.raw_dir, exist_ok=True)
+    os.makedirs(config.done_dir, exist_ok=True)
+
+    print(f"📁 输入目录: {config.input_dir}")
+    print(f"📁 解密输出: {config.raw_dir}")
+    print(f"📁 完成目录: {config.done_dir}")
+    print("-" * 50)
+
+
+def cmd_run():
+    from .browser import decrypt_all
+    from .tagger import process_all_music
+
+    prepare_dirs()
+    if decrypt_all():
+        process_all_music()
+        print(f"\n🎉 全部完成！结果已保存到：{config.done_dir}")
+
+
+def cmd_decrypt():
+    from .browser import decrypt_all
+
+    prepare_dirs()
+    if decrypt_all():
+        print(f"\n🎉 解密完成！结果已保存到：{config.raw_dir}")
+
+
+def cmd_tag():
+    from .tagger import process_all_music
+
+    prepare_dirs()
+    process_all_music()
+    print(f"\n🎉 全部完成！结果已保存到：{config.done_dir}")
+
+
+def cmd_daemon():
+    from .daemon import run_daemon
+
+    run_daemon()
+
+
+def cmd_enqueue():
+    from .cluster import enqueue_all
+
+    print(f"➕ 新入队 {enqueue_all()} 个文件，队列: {config.queue_path}")
+
+
+def cmd_worker():
+    from .cluster import run_worker
+
+    os.makedirs(config.done_dir, exist_ok=True)
+    run_worker()
+    print(f"\n🎉 本节点完成！结果已保存到：{config.done_dir}")
+
+
+def cmd_merge_report():
+    from .cluster import merge_report
+
+    merge_report()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config.configure(args)
+
+    command = "daemon" if args.daemon else (args.command or "run")
+    if command == "daemon":
+        cmd_daemon()
+        return
+
+    handlers = {"run": cmd_run, "decrypt": cmd_decrypt, "tag": cmd_tag, "enqueue": cmd_enqueue,
+                "worker": cmd_worker, "merge-report": cmd_merge_report}
+    # 未指定子命令时保持原来双击运行的行为：出错只打印，结束后停留等待按键
+    legacy = args.command is None
+    try:
+        handlers[command]()
+    except Exception as e:
+        print(f"\n❌ 程序执行出错: {e}")
+        if not legacy:
+            sys.exit(1)
+    finally:
+        if legacy:
+            # 让界面停留，等待用户按键
+            print("\n" + "=" * 50)
+            print("程序执行完成，按任意键退出...")
+            input()  # 等待用户按键
@@ -0,0 +1,275 @@
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from . import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    path TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'pending',
+    node TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    updated REAL
+)
+"""
+
+_conn = None
+_lock = threading.Lock()
+
+
+def node_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _get_conn():
+    """共享卷上的 SQLite 队列；不使用 WAL，网络文件系统上只有回滚日志模式的锁是可靠的"""
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(config.queue_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(config.queue_path, timeout=60, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute(SCHEMA)
+        conn.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_until)")
+        _conn = conn
+    return _conn
+
+
+@contextmanager
+def _write_txn():
+    """写事务：任何一步失败（包括 COMMIT 时数据库被锁）都回滚，避免连接一直持有 RESERVED 锁"""
+    with _lock:
+        conn = _get_conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+
+def _retry(func, *args):
+    """共享卷上偶发的“database is locked”稍后重试，多次失败再抛出"""
+    for attempt in range(5):
+        try:
+            return func(*args)
+        except sqlite3.OperationalError as e:
+            if attempt == 4:
+                raise
+            print(f"⚠️ 队列暂时不可写，稍后重试: {e}")
+            time.sleep(1 + attempt)
+
+
+def _to_key(rel):
+    # 队列中统一使用 / 分隔，Windows 与 Linux 节点可以共用同一个队列
+    return rel.replace(os.sep, "/")
+
+
+def _from_key(key):
+    return os.path.join(*key.split("/"))
+
+
+# ---------------- 入队 ----------------
+def enqueue_all():
+    """扫描解密目录，把尚未入队的文件加入队列，返回新增数量"""
+    from .scan import iter_files
+
+    added, batch = 0, []
+
+    def flush():
+        nonlocal added
+        with _write_txn() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO tasks (path, updated) VALUES (?, ?)",
+                             [(key, time.time()) for key in batch])
+            changed = conn.total_changes - before
+        added += changed
+        batch.clear()
+
+    for rel, _ in iter_files(config.raw_dir, config.audio_exts, recursive=config.recursive,
+                             workers=config.scan_workers, skip=(config.done_dir,)):
+        batch.append(_to_key(rel))
+        if len(batch) >= 500:
+            _retry(flush)
+    if batch:
+        _retry(flush)
+    return added
+
+
+# ---------------- 领取、续租、完成 ----------------
+def claim(node, n):
+    """领取最多 n 个待处理或租约已过期的任务"""
+    now = time.time()
+    claimed = []
+    with _write_txn() as conn:
+        rows = conn.execute(
+            "SELECT path, attempts FROM tasks WHERE state = 'pending' "
+            "OR (state = 'claimed' AND lease_until < ?) LIMIT ?", (now, n)).fetchall()
+        for path, attempts in rows:
+            if attempts >= config.max_attempts:
+                # 多次领取都未完成（节点在处理该文件时崩溃），不再重试
+                conn.execute("UPDATE tasks SET state = 'failed', node = ?, result = ?, updated = ? "
+                             "WHERE path = ?",
+                             (node, json.dumps({"file": path, "status": "failed",
+                                                "error": f"领取 {attempts} 次均未完成"},
+                                               ensure_ascii=False), now, path))
+                continue
+            conn.execute("UPDATE tasks SET state = 'claimed', node = ?, lease_until = ?, "
+                         "attempts = attempts + 1, updated = ? WHERE path = ?",
+                         (node, now + config.lease_seconds, now, path))
+            claimed.append(path)
+    return claimed
+
+
+def heartbeat(node, paths):
+    """为本节点仍在处理的任务续租"""
+    if not paths:
+        return
+    now = time.time()
+    with _write_txn() as conn:
+        conn.executemany("UPDATE tasks SET lease_until = ?, updated = ? "
+                         "WHERE path = ? AND node = ? AND state = 'claimed'",
+                         [(now + config.lease_seconds, now, path, node) for path in paths])
+
+
+def complete(node, path, record):
+    state = "failed" if record["status"] == "failed" else "done"
+    record = dict(record, file=path, node=node)
+    with _write_txn() as conn:
+        conn.execute("UPDATE tasks SET state = ?, result = ?, lease_until = NULL, updated = ? "
+                     "WHERE path = ? AND node = ?",
+                     (state, json.dumps(record, ensure_ascii=False), time.time(), path, node))
+
+
+def active_leases():
+    with _lock:
+        return _get_conn().execute("SELECT COUNT(*) FROM tasks WHERE state = 'claimed'").fetchone()[0]
+
+
+# ---------------- 工作节点 ----------------
+def run_worker():
+    """从共享队列领取文件并在本机处理，直到队列中没有可领取的任务"""
+    from .report import make_record
+    from .tagger import process_single_file
+
+    node = node_id()
+    window = config.max_inflight or config.max_workers * 4
+    in_progress = set()
+    progress_lock = threading.Lock()
+    completed = queue.Queue()
+    stop = threading.Event()
+    counts = {"ok": 0, "failed": 0, "duplicate": 0}
+
+    print(f"🖧 节点 {node} 使用队列: {config.queue_path}")
+    if config.enqueue:
+        print(f"➕ 新入队 {enqueue_all()} 个文件")
+
+    def heartbeat_loop():
+        while not stop.wait(config.lease_seconds / 3):
+            with progress_lock:
+                paths = list(in_progress)
+            try:
+                heartbeat(node, paths)
+            except sqlite3.Error as e:
+                print(f"⚠️ 续租失败: {e}")
+
+    threading.Thread(target=heartbeat_loop, daemon=True).start()
+
+    def handle(path, future):
+        try:
+            fname, success, data = future.result()
+            record = make_record(fname, success, data)
+        except Exception as e:
+            record = make_record(_from_key(path), False, f"处理异常: {e}")
+        _retry(complete, node, path, record)
+        with progress_lock:
+            in_progress.discard(path)
+        counts[record["status"]] += 1
+        if record["status"] == "ok":
+            print(f"[✅] 已处理：{path} (Track {record['track']})")
+        elif record["status"] == "duplicate":
+            print(f"[♻️] 重复文件：{path} - {record['message']}")
+        else:
+            print(f"[❌] 处理失败：{path} - {record['error']}")
+
+    start_time = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=config.max_workers) as executor:
+            while True:
+                while not completed.empty():
+                    handle(*completed.get())
+
+                with progress_lock:
+                    free = window - len(in_progress)
+                paths = _retry(claim, node, min(free, config.max_workers)) if free > 0 else []
+                for path in paths:
+                    with progress_lock:
+                        in_progress.add(path)
+                    future = executor.submit(process_single_file, _from_key(path))
+                    future.add_done_callback(lambda f, key=path: completed.put((key, f)))
+
+                if paths:
+                    continue
+                with progress_lock:
+                    busy = bool(in_progress)
+                if busy:
+                    handle(*completed.get())
+                elif _retry(active_leases):
+                    # 其他节点仍在处理；等待其完成或租约过期后接手
+                    time.sleep(min(5, config.lease_seconds / 3))
+                else:
+                    break
+    finally:
+        stop.set()
+        if config.lyrics:
+            from .lyrics import close_lyrics_cache
+
+            close_lyrics_cache()
+
+    total_time = time.time() - start_time
+    print(f"\n🖧 节点 {node} 完成，耗时 {total_time:.2f}秒")
+    print(f"✅ 成功: {counts['ok']} 个")
+    print(f"❌ 失败: {counts['failed']} 个")
+    if counts["duplicate"]:
+        print(f"♻️ 重复: {counts['duplicate']} 个")
+
+
+# ---------------- 汇总报告 ----------------
+def merge_report():
+    """把各节点写入队列的结果合并为一个 JSONL 报告，并按节点输出统计"""
+    from .report import ReportWriter, default_report_path
+
+    path = config.report_path or default_report_path()
+    writer = ReportWriter(path)
+    summary = {}
+    states = {}
+    try:
+        with _lock:
+            rows = _get_conn().execute("SELECT path, state, node, result FROM tasks ORDER BY updated")
+            for key, state, node, result in rows:
+                states[state] = states.get(state, 0) + 1
+                if not result:
+                    continue
+                record = json.loads(result)
+                writer.write_record(record)
+                by_node = summary.setdefault(record.get("node") or node or "-", {})
+                by_node[record["status"]] = by_node.get(record["status"], 0) + 1
+    finally:
+        writer.close()
+
+    print(f"📝 汇总报告: {path}")
+    print("队列状态: " + "，".join(f"{k} {v}" for k, v in sorted(states.items())))
+    for node, stats in sorted(summary.items()):
+        print(f"  - {node}: " + "，".join(f"{k} {v}" for k, v in sorted(stats.items())))
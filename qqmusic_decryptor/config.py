@@ -0,0 +1,98 @@
+import os
+import sys
+
+# -------------------- 相对路径支持 --------------------
+# 获取exe所在目录
+if getattr(sys, 'frozen', False):
+    # 运行在打包后的exe中
+    application_path = os.path.dirname(sys.executable)
+else:
+    # 运行在Python脚本中（包的上一级目录，即 music_decode_edit.py 所在目录）
+    application_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 设置相对路径
+default_driver_path = os.path.join(application_path, "msedgedriver.exe")
+
+# 保持你原来的输入输出路径
+default_source_dir = r"E:\music\VipSongsDownload"
+default_raw_dir = r"E:\edge\raw"
+default_done_dir = r"E:\edge\done"
+
+enc_exts = ('.mflac', '.mmp4', '.mgg')
+audio_exts = ('.flac', '.mp3', '.m4a', '.mp4', '.wav', '.ogg', '.aac')
+
+# ---------------- 运行配置（由 configure() 覆盖） ----------------
+input_dir = default_source_dir
+raw_dir = default_raw_dir
+done_dir = default_done_dir
+edge_driver_path = default_driver_path
+max_workers = 5
+recursive = True  # 是否扫描子目录
+scan_workers = 4  # 并行扫描目录的线程数
+
+max_inflight = 0  # 同时排队的任务数上限，0 表示线程数的 4 倍
+max_memory_mb = 0  # 内存上限（MB），0 表示不限制
+cache_entries = 2000  # 元数据、专辑、封面地址缓存各自的条目上限
+report_path = ""  # JSONL 结果报告路径，留空时自动生成
+upload_batch = 100  # 每次上传解密的文件数
+
+queue_path = ""  # 多节点共享队列路径，留空时使用解密目录下的 .qqmusic_queue.sqlite3
+lease_seconds = 120  # 领取任务的租约时长，节点崩溃后超过此时间由其他节点接手
+max_attempts = 3  # 同一文件最多被领取的次数
+enqueue = False  # worker 启动时是否先扫描解密目录入队
+
+lyrics = False  # 是否获取并嵌入歌词
+lyrics_cache_path = os.path.join(application_path, "lyrics_cache.sqlite3")
+
+dedup = "off"  # 重复文件处理方式：off / skip / link
+dedup_fingerprint = False  # 是否同时按歌手、标题、时长识别不同编码的同一首歌
+dedup_db_path = os.path.join(application_path, "dedup.sqlite3")
+
+cover_size = 0  # 封面最大边长（像素），0 表示不缩放
+cover_max_kb = 0  # 封面大小上限（KB），0 表示不限制
+cover_cache_mb = 64  # 内存中封面缓存的总大小上限（MB）
+
+batch_size = 20
+batch_ms = 2000
+poll_ms = 500
+status_port = 8765
+
+
+def configure(args):
+    """用命令行参数覆盖运行配置，未提供的参数保持当前值"""
+    global input_dir, raw_dir, done_dir, edge_driver_path, max_workers
+    global recursive, scan_workers, cover_size, cover_max_kb, cover_cache_mb
+    global lyrics, lyrics_cache_path
+    global dedup, dedup_fingerprint, dedup_db_path
+    global max_inflight, max_memory_mb, cache_entries, report_path, upload_batch
+    global queue_path, lease_seconds, max_attempts, enqueue
+    global batch_size, batch_ms, poll_ms, status_port
+
+    input_dir = getattr(args, "source", input_dir)
+    raw_dir = getattr(args, "raw", raw_dir)
+    done_dir = getattr(args, "done", done_dir)
+    edge_driver_path = getattr(args, "driver", edge_driver_path)
+    max_workers = getattr(args, "threads", max_workers)
+    recursive = not getattr(args, "no_recursive", not recursive)
+    scan_workers = max(1, getattr(args, "scan_workers", scan_workers))
+    max_inflight = max(0, getattr(args, "max_inflight", max_inflight))
+    max_memory_mb = max(0, getattr(args, "max_memory_mb", max_memory_mb))
+    cache_entries = max(1, getattr(args, "cache_entries", cache_entries))
+    report_path = getattr(args, "report", report_path)
+    upload_batch = max(1, getattr(args, "upload_batch", upload_batch))
+    queue_path = getattr(args, "queue", queue_path) or os.path.join(raw_dir, ".qqmusic_queue.sqlite3")
+    lease_seconds = max(10, getattr(args, "lease_seconds", lease_seconds))
+    max_attempts = max(1, getattr(args, "max_attempts", max_attempts))
+    enqueue = getattr(args, "enqueue", enqueue)
+    lyrics = getattr(args, "lyrics", lyrics)
+    lyrics_cache_path = getattr(args, "lyrics_cache", lyrics_cache_path)
+    dedup = getattr(args, "dedup", dedup)
+    dedup_fingerprint = getattr(args, "dedup_fingerprint", dedup_fingerprint)
+    dedup_db_path = getattr(args, "dedup_db", dedup_db_path)
+    cover_size = max(0, getattr(args, "cover_size", cover_size))
+    cover_max_kb = max(0, getattr(args, "cover_max_kb", cover_max_kb))
+    cover_cache_mb = max(0, getattr(args, "cover_cache_mb", cover_cache_mb))
+    batch_size = max(1, getattr(args, "batch_size", batch_size))
+    batch_ms = max(0, getattr(args, "batch_ms", batch_ms))
+    poll_ms = max(50, getattr(args, "poll_ms", poll_ms))
+    status_port = getattr(args, "status_port", status_port)
@@ -0,0 +1,138 @@
+import io
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from . import config
+from .tagger import get_session
+
+# ---------------- 封面缓存 ----------------
+# 按字节数限制大小的 LRU：(albummid, profile) -> bytes，超出 cover_cache_mb 时淘汰最久未用的专辑
+cover_data_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+_album_locks = {}  # albummid -> [lock, 引用数]，专辑处理完即移除
+_album_locks_guard = threading.Lock()
+_pillow_warned = False
+
+
+def cover_profile():
+    """当前封面处理配置，None 表示直接嵌入原图"""
+    if config.cover_size <= 0 and config.cover_max_kb <= 0:
+        return None
+    return config.cover_size, config.cover_max_kb
+
+
+def _cache_get(key):
+    with _cache_lock:
+        data = cover_data_cache.get(key)
+        if data is not None:
+            cover_data_cache.move_to_end(key)
+        return data
+
+
+def _cache_put(key, data):
+    global _cache_bytes
+    budget = config.cover_cache_mb * 1024 * 1024
+    with _cache_lock:
+        if key in cover_data_cache or len(data) > budget:
+            return
+        cover_data_cache[key] = data
+        _cache_bytes += len(data)
+        while _cache_bytes > budget:
+            _, old = cover_data_cache.popitem(last=False)
+            _cache_bytes -= len(old)
+
+
+def clear_cover_cache():
+    global _cache_bytes
+    with _cache_lock:
+        cover_data_cache.clear()
+        _cache_bytes = 0
+
+
+@contextmanager
+def _album_lock(albummid):
+    """同一专辑的封面同一时间只由一个线程下载、处理；没有线程等待时释放该锁"""
+    with _album_locks_guard:
+        entry = _album_locks.setdefault(albummid, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _album_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _album_locks[albummid]
+
+
+def transcode_cover(data, size, max_kb):
+    """缩放到 size x size 以内，并逐步降低 JPEG 质量直到不超过 max_kb（0 表示不限制）；
+    原图已满足要求时直接返回原图"""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    budget = max_kb * 1024
+    if (image.format == "JPEG" and (size <= 0 or max(image.size) <= size)
+            and (not budget or len(data) <= budget)):
+        return data
+
+    image = image.convert("RGB")
+    if size > 0:
+        image.thumbnail((size, size), Image.LANCZOS)
+
+    while True:
+        for quality in (90, 80, 70, 60, 50, 40):
+            buf = io.BytesIO()
+            image.save(buf, format="JPEG", quality=quality, optimize=True, progressive=True)
+            if not budget or buf.tell() <= budget:
+                return buf.getvalue()
+        # 最低质量仍超出预算时继续缩小尺寸
+        if min(image.size) <= 100:
+            return buf.getvalue()
+        image = image.resize((int(image.width * 0.85), int(image.height * 0.85)), Image.LANCZOS)
+
+
+def cover_resolution(data):
+    """返回封面图片的“宽x高”，未安装 Pillow 或无法识别时返回 None"""
+    try:
+        from PIL import Image
+
+        width, height = Image.open(io.BytesIO(data)).size
+    except Exception:
+        return None
+    return f"{width}x{height}"
+
+
+def get_cover_data(metadata):
+    """返回要嵌入的封面数据，同一专辑在缓存中时只下载、处理一次"""
+    global _pillow_warned
+
+    if not metadata.get('cover_url'):
+        return None
+
+    profile = cover_profile()
+    key = (metadata['albummid'], profile)
+    data = _cache_get(key)
+    if data is not None:
+        return data
+
+    with _album_lock(metadata['albummid']):
+        data = _cache_get(key)
+        if data is not None:
+            return data
+
+        data = get_session().get(metadata['cover_url'], timeout=10).content
+        if profile is not None:
+            try:
+                data = transcode_cover(data, *profile)
+            except ImportError:
+                if not _pillow_warned:
+                    _pillow_warned = True
+                    print("⚠️ 未安装 Pillow，封面将按原图嵌入（pip install pillow）")
+            except Exception as e:
+                print(f"⚠️ 封面处理失败 {metadata['albummid']}: {e}，使用原图")
+
+        _cache_put(key, data)
+        return data
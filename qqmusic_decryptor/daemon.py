@@ -0,0 +1,323 @@
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from . import browser, config, cover, lyrics, tagger
+from .memory import over_limit, trim_caches
+from .report import ReportWriter, default_report_path
+from .scan import iter_files
+
+daemon_status = {
+    "started_at": None,
+    "batches": 0,
+    "decrypted": 0,
+    "tagged": 0,
+    "failed": 0,
+    "duplicates": 0,
+    "pending_source": 0,
+    "pending_raw": 0,
+    "in_flight": 0,
+    "last_batch_at": None,
+    "last_error": None,
+    "decrypting": 0,
+}
+# 以下两个时间戳用于 /health 判断主循环与解密线程是否卡住（time.monotonic()）
+loop_heartbeat = {"last_loop": None, "decrypt_started": None}
+DECRYPT_STALE_SECONDS = 900  # 单个解密批次超过此时间视为卡住
+RETRY_LIMIT = 3  # 解密或补全标签失败的文件最多重新尝试的次数
+RETRY_DELAY = 30  # 第一次重试前等待的秒数，之后每次加倍
+status_lock = threading.Lock()
+report_file = None
+retry_sources = queue.Queue()  # 解密失败、需要重新解密的源目录文件
+retry_files = queue.Queue()  # 需要重新处理的解密目录文件
+
+
+def update_status(**changes):
+    with status_lock:
+        for key, value in changes.items():
+            daemon_status[key] = value
+
+
+def bump_status(key, n=1):
+    with status_lock:
+        daemon_status[key] += n
+
+
+def health():
+    """主循环超过 60 秒（或 10 个轮询周期）没有运行，或解密批次运行过久时返回异常状态"""
+    now = time.monotonic()
+    last_loop = loop_heartbeat["last_loop"]
+    decrypt_started = loop_heartbeat["decrypt_started"]
+    loop_age = None if last_loop is None else round(now - last_loop, 1)
+    decrypt_age = None if decrypt_started is None else round(now - decrypt_started, 1)
+    problems = []
+    if loop_age is None or loop_age > max(60.0, config.poll_ms / 1000 * 10):
+        problems.append("主循环未运行")
+    if decrypt_age is not None and decrypt_age > DECRYPT_STALE_SECONDS:
+        problems.append("解密批次运行过久")
+    return {"status": "stale" if problems else "ok", "loop_age": loop_age,
+            "decrypt_age": decrypt_age, "problems": problems}
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    """本地状态接口：/health 返回主循环与解密线程的存活情况（异常时 503），/status 返回运行计数"""
+
+    def do_GET(self):
+        code = 200
+        if self.path == "/health":
+            body = health()
+            if body["status"] != "ok":
+                code = 503
+        elif self.path == "/status":
+            with status_lock:
+                body = dict(daemon_status)
+            body["cache"] = {
+                "album": len(tagger.album_cache),
+                "cover_data": len(cover.cover_data_cache),
+                "cover": len(tagger.cover_cache),
+                "lyrics": lyrics.lyrics_cache_size() if config.lyrics else 0,
+                "metadata": len(tagger.metadata_cache),
+            }
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_status_server(port):
+    """在 127.0.0.1 上启动状态接口，port 为 0 时不启动"""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer(("127.0.0.1", port), StatusHandler)
+    except OSError as e:
+        print(f"⚠️ 状态接口启动失败（端口 {port}）: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🩺 状态接口: http://127.0.0.1:{port}/status")
+    return server
+
+
+def scan_ready(directory, exts, sizes, queued, skip=()):
+    """返回大小在两次轮询之间保持不变的新文件（视为已写入完成），路径相对 directory"""
+    ready = []
+    present = set()
+    for name, entry in iter_files(directory, exts, recursive=config.recursive,
+                                  workers=config.scan_workers, skip=skip):
+        present.add(name)
+        if name in queued:
+            continue
+        try:
+            size = entry.stat().st_size
+        except OSError:
+            continue
+        if size > 0 and sizes.get(name) == size:
+            ready.append(name)
+            queued.add(name)
+            sizes.pop(name, None)
+        else:
+            sizes[name] = size
+    # 已被移走的文件不再跟踪，同名文件再次出现时会重新处理
+    queued.intersection_update(present)
+    for name in list(sizes):
+        if name not in present:
+            del sizes[name]
+    return ready
+
+
+def schedule_retries(failed, attempts, waiting, queued, sizes):
+    """把失败的文件按指数退避重新交给扫描：到期后移出 queued，下次扫描到时重新处理
+
+    超过 RETRY_LIMIT 次的文件留在 queued 中不再处理，直到被移走或守护进程重启。
+    """
+    now = time.time()
+    # 已不在跟踪中的文件（处理完成被移走或删除）不再保留失败次数
+    for name in list(attempts):
+        if name not in queued and name not in sizes and name not in waiting:
+            del attempts[name]
+    while not failed.empty():
+        name = failed.get()
+        attempts[name] = attempts.get(name, 0) + 1
+        if attempts[name] > RETRY_LIMIT:
+            print(f"⚠️ {name} 已重试 {RETRY_LIMIT} 次仍未成功，不再处理")
+            continue
+        waiting[name] = now + RETRY_DELAY * 2 ** (attempts[name] - 1)
+    for name, due in list(waiting.items()):
+        if due <= now:
+            del waiting[name]
+            queued.discard(name)
+
+
+def batch_due(pending, first_seen):
+    return pending and (len(pending) >= config.batch_size or
+                        (time.time() - first_seen) * 1000 >= config.batch_ms)
+
+
+def on_tag_done(fname, future):
+    bump_status("in_flight", -1)
+    try:
+        fname, success, data = future.result()
+    except Exception as e:
+        bump_status("failed")
+        update_status(last_error=f"{fname}: {e}")
+        print(f"[❌] 处理异常：{fname} - {e}")
+        retry_files.put(fname)
+        return
+    report_file.write(fname, success, data)
+    if success and data.get('duplicate_of'):
+        bump_status("duplicates")
+        print(f"[♻️] 重复文件：{fname} - {data['message']}")
+        if data.get('duplicate_state') == "pending" and config.dedup == "link":
+            # 原文件当时仍在处理中，稍后重新尝试链接
+            retry_files.put(fname)
+    elif success and isinstance(data, dict):
+        bump_status("tagged")
+        print(f"[✅] 已处理：{fname} (Track {data['track']})")
+    else:
+        bump_status("failed")
+        update_status(last_error=f"{fname}: {data}")
+        print(f"[❌] 处理失败：{fname} - {data}")
+        # 获取元信息失败等多为网络原因，稍后重试
+        retry_files.put(fname)
+
+
+_browser = {"driver": None, "wait": None}  # 只在解密线程中使用
+
+
+def decrypt_in_background(batch):
+    """在独立线程中解密一批文件，浏览器在各批次之间复用，出错时下一批重新启动，失败的文件稍后重试"""
+    loop_heartbeat["decrypt_started"] = time.monotonic()
+    update_status(decrypting=len(batch))
+    try:
+        if _browser["driver"] is None:
+            _browser["driver"], _browser["wait"] = browser.setup_browser()
+        if browser.decrypt_batch(_browser["driver"], _browser["wait"], batch):
+            bump_status("decrypted", len(batch))
+            return
+        update_status(last_error=f"解密批次未完成（{len(batch)} 个文件）")
+    except BaseException as e:
+        # setup_browser 失败时会调用 exit()，这里同样只记录错误，守护进程继续运行
+        print(f"❌ 解密批次失败: {e}")
+        update_status(last_error=f"解密失败: {e}")
+        close_browser()
+    finally:
+        loop_heartbeat["decrypt_started"] = None
+        update_status(decrypting=0, last_batch_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+    for name in batch:
+        retry_sources.put(name)
+
+
+def close_browser():
+    if _browser["driver"] is not None:
+        try:
+            _browser["driver"].quit()
+            print("🚫 浏览器已关闭")
+        except Exception:
+            pass
+        _browser["driver"], _browser["wait"] = None, None
+
+
+def run_daemon():
+    """持续监听源目录与解密目录，按批次解密、补全标签"""
+    global report_file
+
+    os.makedirs(config.input_dir, exist_ok=True)
+    os.makedirs(config.raw_dir, exist_ok=True)
+    os.makedirs(config.done_dir, exist_ok=True)
+
+    print(f"📁 监听源目录: {config.input_dir}")
+    print(f"📁 监听解密目录: {config.raw_dir}")
+    print(f"📁 完成目录: {config.done_dir}")
+    print(f"⚙️ 批次: {config.batch_size} 个文件 / {config.batch_ms} 毫秒，轮询 {config.poll_ms} 毫秒")
+    print("-" * 50)
+
+    update_status(started_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+    server = start_status_server(config.status_port)
+    executor = ThreadPoolExecutor(max_workers=config.max_workers)
+    decrypt_executor = ThreadPoolExecutor(max_workers=1)
+    decrypt_future = None
+    window = config.max_inflight or config.max_workers * 4
+    memory_trim_pending = False
+    report_file = ReportWriter(config.report_path or default_report_path())
+    print(f"📝 处理结果写入: {report_file.path}")
+
+    source_sizes, source_queued, source_pending, source_first = {}, set(), [], 0.0
+    raw_sizes, raw_queued, raw_pending, raw_first = {}, set(), [], 0.0
+    source_attempts, source_waiting, raw_attempts, raw_waiting = {}, {}, {}, {}
+
+    try:
+        while True:
+            loop_heartbeat["last_loop"] = time.monotonic()
+            new_files = scan_ready(config.input_dir, config.enc_exts, source_sizes, source_queued,
+                                   skip=(config.raw_dir, config.done_dir))
+            if new_files:
+                if not source_pending:
+                    source_first = time.time()
+                source_pending.extend(new_files)
+
+            new_files = scan_ready(config.raw_dir, config.audio_exts, raw_sizes, raw_queued,
+                                   skip=(config.done_dir,))
+            if new_files:
+                if not raw_pending:
+                    raw_first = time.time()
+                raw_pending.extend(new_files)
+
+            schedule_retries(retry_sources, source_attempts, source_waiting, source_queued, source_sizes)
+            schedule_retries(retry_files, raw_attempts, raw_waiting, raw_queued, raw_sizes)
+
+            update_status(pending_source=len(source_pending), pending_raw=len(raw_pending))
+
+            with status_lock:
+                in_flight = daemon_status["in_flight"]
+            if in_flight == 0 and memory_trim_pending:
+                trim_caches()
+                memory_trim_pending = False
+            if batch_due(raw_pending, raw_first) and in_flight < window and not memory_trim_pending:
+                if over_limit(config.max_memory_mb):
+                    # 超出内存上限：等进行中的任务完成、清理缓存后再继续提交
+                    print(f"⚠️ 内存占用超过 {config.max_memory_mb} MB，暂停提交并清理缓存")
+                    memory_trim_pending = True
+                else:
+                    size = min(config.batch_size, window - in_flight)
+                    batch, raw_pending = raw_pending[:size], raw_pending[size:]
+                    raw_first = time.time()
+                    print(f"🎵 提交 {len(batch)} 个文件补全标签")
+                    for fname in batch:
+                        bump_status("in_flight")
+                        future = executor.submit(tagger.process_single_file, fname)
+                        future.add_done_callback(lambda f, name=fname: on_tag_done(name, f))
+                    bump_status("batches")
+                    update_status(last_batch_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+
+            # 解密在独立线程中进行，期间主循环继续提交补全标签任务
+            decrypt_idle = decrypt_future is None or decrypt_future.done()
+            if decrypt_idle and batch_due(source_pending, source_first):
+                batch, source_pending = source_pending[:config.batch_size], source_pending[config.batch_size:]
+                source_first = time.time()
+                print(f"📂 解密 {len(batch)} 个加密文件")
+                decrypt_future = decrypt_executor.submit(decrypt_in_background, batch)
+                bump_status("batches")
+
+            time.sleep(config.poll_ms / 1000)
+    except KeyboardInterrupt:
+        print("\n🛑 收到退出信号，等待进行中的任务完成...")
+    finally:
+        executor.shutdown(wait=True)
+        decrypt_executor.shutdown(wait=True)
+        close_browser()
+        lyrics.close_lyrics_cache()
+        report_file.close()
+        if server is not None:
+            server.shutdown()
@@ -0,0 +1,250 @@
+import hashlib
+import os
+import sqlite3
+import struct
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from . import config
+
+SAMPLE_SIZE = 256 * 1024  # 内容哈希在音频区的头、中、尾各取的字节数
+PENDING_TIMEOUT = 3600  # 处理中的登记超过此时间（秒）视为遗留记录
+
+_conn = None
+_lock = threading.Lock()
+
+
+# ---------------- 音频区定位（跳过标签） ----------------
+def _skip_id3v2(f):
+    """返回文件开头 ID3v2 标签之后的偏移"""
+    f.seek(0)
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b"ID3":
+        size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        return 10 + size + (10 if header[5] & 0x10 else 0)
+    return 0
+
+
+def _flac_region(f, file_size):
+    start = _skip_id3v2(f)
+    f.seek(start)
+    if f.read(4) != b"fLaC":
+        return start, file_size - start
+    pos = start + 4
+    while True:
+        f.seek(pos)
+        header = f.read(4)
+        if len(header) < 4:
+            break
+        pos += 4 + int.from_bytes(header[1:4], "big")
+        if header[0] & 0x80:
+            break
+    return pos, file_size - pos
+
+
+def _mp3_region(f, file_size):
+    start = _skip_id3v2(f)
+    end = file_size
+    f.seek(max(0, end - 128))
+    if f.read(3) == b"TAG":
+        end -= 128
+    f.seek(max(0, end - 32))
+    footer = f.read(32)
+    if footer[:8] == b"APETAGEX":
+        size, flags = struct.unpack("<I4xI", footer[12:24])
+        end -= size + (32 if flags & 0x80000000 else 0)
+    return start, max(0, end - start)
+
+
+def _mp4_region(f, file_size):
+    """返回最大的 mdat 原子的数据区，元数据都在 moov 中"""
+    best = (0, file_size)
+    pos = 0
+    found = False
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        size, kind = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header:
+            break
+        if kind == b"mdat" and (not found or size - header > best[1]):
+            best = (pos + header, size - header)
+            found = True
+        pos += size
+    return best
+
+
+def _ogg_hash(f, h):
+    """Ogg 的注释位于头部页面中，只对 granule 不为 0 的音频页数据计算哈希"""
+    f.seek(0)
+    total = 0
+    while True:
+        header = f.read(27)
+        if len(header) < 27 or header[:4] != b"OggS":
+            break
+        granule = struct.unpack("<q", header[6:14])[0]
+        lacing = f.read(header[26])
+        body = f.read(sum(lacing))
+        if granule != 0:
+            h.update(body)
+            total += len(body)
+    return total
+
+
+def content_hash(path):
+    """计算音频数据（不含标签）的快速哈希：音频区长度 + 头、中、尾各一段采样"""
+    ext = os.path.splitext(path)[1].lower()
+    file_size = os.path.getsize(path)
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        if ext == ".ogg":
+            total = _ogg_hash(f, h)
+            h.update(struct.pack("<Q", total))
+            return h.hexdigest()
+        if ext == ".flac":
+            start, length = _flac_region(f, file_size)
+        elif ext == ".mp3":
+            start, length = _mp3_region(f, file_size)
+        elif ext in (".m4a", ".mp4"):
+            start, length = _mp4_region(f, file_size)
+        else:
+            start, length = 0, file_size
+
+        h.update(struct.pack("<Q", length))
+        if length <= SAMPLE_SIZE * 3:
+            f.seek(start)
+            h.update(f.read(length))
+        else:
+            for offset in (0, (length - SAMPLE_SIZE) // 2, length - SAMPLE_SIZE):
+                f.seek(start + offset)
+                h.update(f.read(SAMPLE_SIZE))
+    return h.hexdigest()
+
+
+def fingerprint(path):
+    """简易指纹：标签中的歌手、标题与时长（秒），用于识别不同编码的同一首歌；缺少信息时返回 None"""
+    import mutagen
+
+    try:
+        audio = mutagen.File(path, easy=True)
+    except Exception:
+        return None
+    if audio is None or audio.tags is None or not getattr(audio.info, "length", 0):
+        return None
+    artist = (audio.tags.get("artist") or [""])[0].strip().lower()
+    title = (audio.tags.get("title") or [""])[0].strip().lower()
+    if not artist or not title:
+        return None
+    key = f"{artist}\0{title}\0{round(audio.info.length)}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# ---------------- 持久化索引 ----------------
+def owner_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+@contextmanager
+def _write_txn():
+    """跨进程的写事务：先加写锁再检查，避免两个进程同时登记同一内容；失败时回滚"""
+    with _lock:
+        conn = _get_conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(config.dedup_db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("CREATE TABLE IF NOT EXISTS tracks ("
+                     "key TEXT PRIMARY KEY, path TEXT, state TEXT NOT NULL, added REAL NOT NULL, owner TEXT)")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(tracks)")}
+        if "owner" not in columns:
+            conn.execute("ALTER TABLE tracks ADD COLUMN owner TEXT")
+        # 只清理本进程或已超时的未完成记录，其他进程（守护模式、其他节点）正在处理的登记保持不变
+        conn.execute("DELETE FROM tracks WHERE state = 'pending' AND (owner = ? OR added < ?)",
+                     (owner_id(), time.time() - PENDING_TIMEOUT))
+        _conn = conn
+    return _conn
+
+
+def file_keys(path):
+    keys = ["hash:" + content_hash(path)]
+    if config.dedup_fingerprint:
+        fp = fingerprint(path)
+        if fp:
+            keys.append("fp:" + fp)
+    return keys
+
+
+def claim(keys, fname):
+    """登记一个待处理文件，成功返回 None；已有相同内容的文件时返回 (原文件路径, 状态)
+
+    原文件仍在处理中时立即返回 pending 状态，不在这里等待，由调用方稍后重试。
+    """
+    now = time.time()
+    with _write_txn() as conn:
+        for key in keys:
+            row = conn.execute("SELECT path, state, added FROM tracks WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                continue
+            path, state, added = row
+            if state == "pending" and added >= now - PENDING_TIMEOUT:
+                return path, state
+            if state == "done" and os.path.exists(os.path.join(config.done_dir, path)):
+                return path, state
+            # 完成目录中的原文件已被删除，或处理中的登记已超时，允许重新处理
+            conn.execute("DELETE FROM tracks WHERE key = ?", (key,))
+        conn.executemany("INSERT OR REPLACE INTO tracks (key, path, state, added, owner) "
+                         "VALUES (?, ?, 'pending', ?, ?)",
+                         [(key, fname, now, owner_id()) for key in keys])
+    return None
+
+
+def confirm(keys, done_path):
+    with _write_txn() as conn:
+        conn.executemany("UPDATE tracks SET path = ?, state = 'done' WHERE key = ?",
+                         [(done_path, key) for key in keys])
+
+
+def release(keys):
+    """处理失败时撤销本进程的登记，后续的同内容文件可以重新处理"""
+    with _write_txn() as conn:
+        conn.executemany("DELETE FROM tracks WHERE key = ? AND state = 'pending' AND owner = ?",
+                         [(key, owner_id()) for key in keys])
+
+
+def handle_duplicate(fname, input_path, original, state):
+    """按 --dedup 设置处理重复文件，返回说明文字"""
+    if state == "pending":
+        if config.dedup == "link":
+            return f"与 {original} 重复，但原文件仍在处理中，暂未链接，已保留在解密目录，稍后重试"
+        return f"与处理中的 {original} 重复，已跳过"
+    if config.dedup == "link":
+        original_path = os.path.join(config.done_dir, original)
+        if os.path.exists(original_path):
+            from .tagger import unique_path
+
+            target = unique_path(os.path.join(config.done_dir, fname))
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.link(original_path, target)
+                os.remove(input_path)
+                return f"已硬链接到 {original}"
+            except OSError as e:
+                return f"与 {original} 重复，硬链接失败已跳过: {e}"
+    return f"与 {original} 重复，已跳过"
@@ -0,0 +1,99 @@
+import base64
+import json
+import sqlite3
+import threading
+
+from . import config
+from .tagger import get_session
+
+# ---------------- 歌词缓存 ----------------
+# songmid -> LRC 文本，保存在 SQLite 中按键查询、逐条写入，不在内存中保留整个缓存；
+# 空字符串表示该歌曲没有歌词
+_conn = None
+_db_lock = threading.Lock()
+_inflight_lock = threading.Lock()
+_inflight = {}  # songmid -> Event，同一首歌并发请求时只查询一次
+NO_LYRICS_CODE = -1901  # 接口表示该歌曲没有歌词的返回码
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(config.lyrics_cache_path, timeout=30, check_same_thread=False)
+        conn.execute("CREATE TABLE IF NOT EXISTS lyrics (songmid TEXT PRIMARY KEY, lyric TEXT NOT NULL)")
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def _lookup(songmid):
+    with _db_lock:
+        row = _get_conn().execute("SELECT lyric FROM lyrics WHERE songmid = ?", (songmid,)).fetchone()
+    return row[0] if row else None
+
+
+def _store(songmid, lyric):
+    with _db_lock:
+        conn = _get_conn()
+        conn.execute("INSERT OR REPLACE INTO lyrics (songmid, lyric) VALUES (?, ?)", (songmid, lyric))
+        conn.commit()
+
+
+def lyrics_cache_size():
+    with _db_lock:
+        return _get_conn().execute("SELECT COUNT(*) FROM lyrics").fetchone()[0]
+
+
+def close_lyrics_cache():
+    global _conn
+    with _db_lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+def fetch_lyrics(songmid):
+    url = f"https://c.y.qq.com/lyric/fcgi-bin/fcg_query_lyric_new.fcg?songmid={songmid}&format=json"
+    resp = get_session().get(url, timeout=10)
+    text = resp.text.strip()
+    # 部分情况下接口仍返回 JSONP：MusicJsonCallback({...})
+    if not text.startswith("{"):
+        text = text[text.index("(") + 1:text.rindex(")")]
+    data = json.loads(text)
+    lyric = data.get("lyric")
+    if lyric:
+        return base64.b64decode(lyric).decode("utf-8", errors="replace").strip()
+    code = data.get("retcode", data.get("code"))
+    if code in (0, NO_LYRICS_CODE):
+        return ""
+    # 限流、Referer 被拒绝等错误不能当作“没有歌词”缓存下来
+    raise RuntimeError(f"歌词接口返回错误 {code}")
+
+
+def get_lyrics(songmid):
+    """返回 songmid 对应的 LRC 歌词，没有歌词时返回空字符串，查询失败返回 None"""
+    while True:
+        lyric = _lookup(songmid)
+        if lyric is not None:
+            return lyric
+        with _inflight_lock:
+            event = _inflight.get(songmid)
+            if event is None:
+                event = _inflight[songmid] = threading.Event()
+                break
+        # 其他线程正在查询同一首歌，等待其结果后重新读取缓存
+        event.wait()
+        if _lookup(songmid) is None:
+            return None
+
+    lyric = None
+    try:
+        lyric = fetch_lyrics(songmid)
+        _store(songmid, lyric)
+    except Exception as e:
+        print(f"⚠️ 获取歌词失败 {songmid}: {e}")
+    finally:
+        with _inflight_lock:
+            del _inflight[songmid]
+        event.set()
+    return lyric
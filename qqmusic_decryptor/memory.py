@@ -0,0 +1,57 @@
+import gc
+import os
+import sys
+
+_warned = False
+_trimmed_rss = None  # 上次清理缓存后的内存占用（MB），尚未清理过时为 None
+
+
+def current_rss_mb():
+    """当前进程常驻内存（MB），无法获取时返回 None"""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def over_limit(limit_mb):
+    """是否超过内存上限；limit_mb 为 0 时不限制
+
+    CPython 清理缓存后通常不会把内存还给系统，因此清理一次后只有在内存比清理后
+    再增长上限的 10%（至少 64 MB）时才再次触发，避免每次检查都排空任务窗口。
+    """
+    global _warned
+    if limit_mb <= 0:
+        return False
+    rss = current_rss_mb()
+    if rss is None:
+        if not _warned:
+            _warned = True
+            print("⚠️ 无法读取内存占用，--max-memory-mb 不生效（Windows 上请 pip install psutil）")
+        return False
+    if _trimmed_rss is None:
+        return rss > limit_mb
+    return rss > max(limit_mb, _trimmed_rss + max(64, limit_mb * 0.1))
+
+
+def trim_caches():
+    """清空可重建的内存缓存，并记录清理后的内存占用"""
+    global _trimmed_rss
+    from . import tagger
+
+    tagger.metadata_cache.clear()
+    tagger.album_cache.clear()
+    tagger.cover_cache.clear()
+    cover = sys.modules.get(__package__ + ".cover")
+    if cover is not None:
+        cover.clear_cover_cache()
+    gc.collect()
+    _trimmed_rss = current_rss_mb() or 0
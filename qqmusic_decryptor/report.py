@@ -0,0 +1,49 @@
+import json
+import os
+import threading
+import time
+
+
+def make_record(fname, success, data):
+    """把 process_single_file 的返回值转换为报告记录"""
+    record = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "file": fname}
+    if success and isinstance(data, dict) and data.get('duplicate_of'):
+        record.update(status="duplicate", duplicate_of=data['duplicate_of'],
+                      duplicate_state=data.get('duplicate_state'), message=data['message'])
+    elif success and isinstance(data, dict):
+        record.update(status="ok", title=data.get('title'), artist=data.get('artist'),
+                      album=data.get('album'), track=data.get('track'), songmid=data.get('songmid'))
+    else:
+        record.update(status="failed", error=str(data))
+    return record
+
+
+class ReportWriter:
+    """逐条写入 JSONL 格式的处理结果，不在内存中保留"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, fname, success, data, **extra):
+        self.write_record(dict(make_record(fname, success, data), **extra))
+
+    def write_record(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def default_report_path():
+    from . import config
+
+    return os.path.join(config.application_path, "reports", time.strftime("report-%Y%m%d-%H%M%S.jsonl"))
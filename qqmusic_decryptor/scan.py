@@ -0,0 +1,87 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_DONE = object()
+MAX_BUFFERED_DIRS = 64  # 并行扫描时最多缓存多少个目录的结果，调用方处理变慢时扫描线程随之等待
+
+
+def _list_dir(path, exts, recursive, skip):
+    """扫描单个目录，返回 (匹配的文件, 子目录)；文件以 DirEntry 返回以复用其缓存的 stat"""
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and os.path.normcase(entry.path) not in skip:
+                            subdirs.append(entry.path)
+                    elif entry.name.lower().endswith(exts) and entry.is_file():
+                        files.append(entry)
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"⚠️ 无法读取目录 {path}: {e}")
+    return files, subdirs
+
+
+def iter_files(root, exts, recursive=True, workers=1, skip=()):
+    """流式返回 root 下扩展名匹配的文件 (相对路径, DirEntry)
+
+    workers > 1 时各子目录由线程池并行扫描，先扫到的文件先返回，
+    调用方无需等待整棵目录树列举完毕即可开始处理。skip 中的目录不会进入。
+    """
+    skip = {os.path.normcase(os.path.abspath(p)) for p in skip}
+    root = os.path.abspath(root)
+
+    if not recursive or workers <= 1:
+        stack = [root]
+        while stack:
+            files, subdirs = _list_dir(stack.pop(), exts, recursive, skip)
+            for entry in files:
+                yield os.path.relpath(entry.path, root), entry
+            stack.extend(reversed(subdirs))
+        return
+
+    results = queue.Queue(maxsize=MAX_BUFFERED_DIRS)
+    stop = threading.Event()
+    pending = [1]
+    lock = threading.Lock()
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def scan(path):
+        if stop.is_set():
+            files, subdirs = [], []
+        else:
+            files, subdirs = _list_dir(path, exts, recursive, skip)
+        if files:
+            put(files)
+        with lock:
+            pending[0] += len(subdirs) - 1
+            finished = pending[0] == 0
+        for sub in subdirs:
+            executor.submit(scan, sub)
+        if finished:
+            put(_DONE)
+
+    executor.submit(scan, root)
+    try:
+        while True:
+            files = results.get()
+            if files is _DONE:
+                break
+            for entry in files:
+                yield os.path.relpath(entry.path, root), entry
+    finally:
+        # 调用方提前结束迭代时，剩余目录不再展开
+        stop.set()
+        executor.shutdown(wait=False)
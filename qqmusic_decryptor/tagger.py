@@ -0,0 +1,484 @@
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+
+headers = {
+    "Referer": "https://y.qq.com/",
+    "User-Agent": "Mozilla/5.0"
+}
+
+class LRUCache(OrderedDict):
+    """线程安全的 LRU 缓存，条目数上限取自 config.cache_entries，超出时淘汰最久未用的条目"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self:
+                return default
+            self.move_to_end(key)
+            return super().__getitem__(key)
+
+    def put(self, key, value):
+        with self._lock:
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            while len(self) > config.cache_entries:
+                self.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+
+
+# ---------------- 全局缓存 ----------------
+album_cache = LRUCache()  # 专辑信息缓存: albummid -> tracks
+cover_cache = LRUCache()  # 封面URL缓存: albummid -> (url, size)
+metadata_cache = LRUCache()  # 元数据缓存: query -> metadata
+
+MAX_LISTED_FAILURES = 50  # 结尾最多列出的失败条数
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """首次使用时创建共享的 requests.Session，守护模式下各批次之间复用连接池"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.headers.update(headers)
+                session.mount("https://", HTTPAdapter(pool_connections=10,
+                                                      pool_maxsize=max(10, config.max_workers)))
+                _session = session
+    return _session
+
+
+def extract_song_info(file_path):
+    from mutagen.flac import FLAC
+    from mutagen.mp3 import EasyMP3
+    from mutagen.mp4 import MP4
+    from mutagen.oggvorbis import OggVorbis
+
+    ext = os.path.splitext(file_path)[1].lower()
+    filename = os.path.basename(file_path)
+
+    try:
+        if ext == '.flac':
+            audio = FLAC(file_path)
+            title = audio.get('title', [''])[0]
+            artist = audio.get('artist', [''])[0]
+
+        elif ext == '.mp3':
+            audio = EasyMP3(file_path)
+            title = audio.get('title', [''])[0]
+            artist = audio.get('artist', [''])[0]
+
+        elif ext in ['.m4a', '.mp4']:
+            audio = MP4(file_path)
+            title = audio.get("\xa9nam", [''])[0] if "\xa9nam" in audio else ''
+            artist = audio.get("\xa9ART", [''])[0] if "\xa9ART" in audio else ''
+
+        elif ext == '.ogg':
+            audio = OggVorbis(file_path)
+            title = audio.get('title', [''])[0]
+            artist = audio.get('artist', [''])[0]
+
+        else:
+            return extract_from_filename(filename)
+
+        if title and artist:
+            return artist.strip(), title.strip()
+        else:
+            return extract_from_filename(filename)
+
+    except Exception as e:
+        print(f"⚠️ 读取文件标签失败 {filename}: {e}")
+        return extract_from_filename(filename)
+
+
+def extract_from_filename(filename):
+    base = os.path.splitext(filename)[0]
+    if ' - ' in base:
+        parts = base.split(' - ', 1)
+        return parts[0].strip(), parts[1].strip()
+    return "", base.strip()
+
+
+def search_song(query):
+    # 检查缓存
+    cached = metadata_cache.get(query)
+    if cached is not None:
+        return cached
+
+    url = f"https://c.y.qq.com/soso/fcgi-bin/client_search_cp?format=json&p=1&n=1&w={query}"
+    try:
+        resp = get_session().get(url, timeout=10)
+        data = resp.json()
+
+        if not data.get('data') or not data['data'].get('song') or not data['data']['song'].get('list') or len(
+                data['data']['song']['list']) == 0:
+            print(f"⚠️ 未找到歌曲: {query}")
+            return None
+
+        song = data['data']['song']['list'][0]
+        cover_url, cover_size = get_best_cover_url(song['albummid'])
+
+        metadata = {
+            'title': song['songname'],
+            'artist': song['singer'][0]['name'],
+            'album': song['albumname'],
+            'albummid': song['albummid'],
+            'songmid': song['songmid'],
+            'track': song.get('index_album', 0),
+            'cover_url': cover_url,
+            'cover_size': cover_size
+        }
+
+        # 存入缓存
+        metadata_cache.put(query, metadata)
+        return metadata
+
+    except Exception as e:
+        print(f"❌ 搜索歌曲时出错 {query}: {e}")
+        return None
+
+
+def get_best_cover_url(albummid):
+    # 检查缓存
+    cached = cover_cache.get(albummid)
+    if cached is not None:
+        return cached
+
+    sizes = ["1500", "800", "500", "300"]
+    for size in sizes:
+        url = f"https://y.qq.com/music/photo_new/T002R{size}x{size}M000{albummid}.jpg"
+        try:
+            resp = get_session().get(url, timeout=5)
+            if resp.status_code == 200 and len(resp.content) > 10 * 1024:
+                cover_cache.put(albummid, (url, size))
+                return url, size
+        except:
+            continue
+
+    cover_cache.put(albummid, ("", "0"))
+    return "", "0"
+
+
+def get_album_tracks(albummid):
+    # 检查缓存
+    cached = album_cache.get(albummid)
+    if cached is not None:
+        return cached
+
+    url = f"https://c.y.qq.com/v8/fcg-bin/fcg_v8_album_info_cp.fcg?albummid={albummid}&format=json"
+    try:
+        resp = get_session().get(url, timeout=10)
+        tracks = resp.json()['data']['list']
+        album_cache.put(albummid, tracks)
+        return tracks
+    except:
+        album_cache.put(albummid, [])
+        return []
+
+
+def find_track_number(tracks, songmid, title):
+    for idx, track in enumerate(tracks, 1):
+        if track['songmid'] == songmid:
+            return idx
+    for idx, track in enumerate(tracks, 1):
+        if track['name'] == title:
+            return idx
+    return 0
+
+
+def write_tags(file_path, metadata):
+    """写入标签、封面和歌词，每个文件只保存一次"""
+    from .cover import cover_profile, cover_resolution, get_cover_data
+    from mutagen.flac import FLAC, Picture
+    from mutagen.mp3 import MP3
+    from mutagen.id3 import APIC, COMM, TALB, TIT2, TPE1, TRCK, USLT
+    from mutagen.mp4 import MP4, MP4Cover
+    from mutagen.oggvorbis import OggVorbis
+
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        if ext == '.flac':
+            audio = FLAC(file_path)
+        elif ext == '.mp3':
+            audio = MP3(file_path)
+            if audio.tags is None:
+                audio.add_tags()
+        elif ext in ['.m4a', '.mp4']:
+            audio = MP4(file_path)
+        elif ext == '.wav':
+            return False, "WAV 格式不支持标签写入"
+        elif ext == '.aac':
+            return False, "AAC 标签支持有限"
+        elif ext == '.ogg':
+            audio = OggVorbis(file_path)
+        else:
+            return False, f"不支持的文件类型: {ext}"
+
+        lyrics = metadata.get('lyrics')
+        if ext in ['.flac', '.ogg']:
+            audio['title'] = metadata['title']
+            audio['artist'] = metadata['artist']
+            audio['album'] = metadata['album']
+            audio['tracknumber'] = str(metadata['track'])
+            audio['comment'] = "Processed by 𝗣𝗔𝗡"
+            if lyrics:
+                audio['lyrics'] = lyrics
+        elif ext == '.mp3':
+            tags = audio.tags
+            tags.setall('TIT2', [TIT2(encoding=3, text=metadata['title'])])
+            tags.setall('TPE1', [TPE1(encoding=3, text=metadata['artist'])])
+            tags.setall('TALB', [TALB(encoding=3, text=metadata['album'])])
+            tags.setall('TRCK', [TRCK(encoding=3, text=str(metadata['track']))])
+            tags.setall('COMM', [COMM(encoding=3, lang='eng', desc='', text="Processed by 𝗣𝗔𝗡")])
+            if lyrics:
+                tags.setall('USLT', [USLT(encoding=3, lang='chi', desc='', text=lyrics)])
+        elif ext in ['.m4a', '.mp4']:
+            audio["\xa9nam"] = metadata['title']
+            audio["\xa9ART"] = metadata['artist']
+            audio["\xa9alb"] = metadata['album']
+            audio["trkn"] = [(metadata['track'], 0)]
+            audio["desc"] = "Processed by 𝗣𝗔𝗡"
+            if lyrics:
+                audio["\xa9lyr"] = lyrics
+
+        cover_data = get_cover_data(metadata)
+        if cover_data and cover_profile() is not None:
+            # 封面经过缩放或压缩时，记录实际嵌入的分辨率而不是原图尺寸
+            metadata['cover_resolution'] = cover_resolution(cover_data)
+        if cover_data:
+            if ext == '.flac':
+                image = Picture()
+                image.data = cover_data
+                image.type = 3
+                image.mime = "image/jpeg"
+                audio.clear_pictures()
+                audio.add_picture(image)
+            elif ext == '.mp3':
+                audio.tags.setall('APIC', [APIC(encoding=3, mime="image/jpeg", type=3, desc="Cover",
+                                                data=cover_data)])
+            elif ext in ['.m4a', '.mp4']:
+                audio["covr"] = [MP4Cover(cover_data, imageformat=MP4Cover.FORMAT_JPEG)]
+
+        audio.save()
+        return True, None
+    except Exception as e:
+        return False, f"写入标签失败: {e}"
+
+
+def unique_path(path):
+    """目标已存在时在文件名后追加序号，避免覆盖"""
+    if not os.path.exists(path):
+        return path
+    base, ext = os.path.splitext(path)
+    n = 2
+    while os.path.exists(f"{base} ({n}){ext}"):
+        n += 1
+    return f"{base} ({n}){ext}"
+
+
+def process_single_file(fname):
+    """处理单个文件的函数，用于并行处理"""
+    input_path = os.path.join(config.raw_dir, fname)
+    dedup_keys = None
+
+    try:
+        if config.dedup != "off":
+            from . import dedup
+
+            # 在任何网络请求和写入之前排除重复文件
+            dedup_keys = dedup.file_keys(input_path)
+            existing = dedup.claim(dedup_keys, fname)
+            if existing:
+                dedup_keys = None
+                original, state = existing
+                return fname, True, {'duplicate_of': original, 'duplicate_state': state,
+                                     'message': dedup.handle_duplicate(fname, input_path, original, state)}
+
+        artist, title = extract_song_info(input_path)
+        query = f"{artist} {title}".strip()
+
+        if not query or query.strip() == "":
+            query = os.path.splitext(os.path.basename(fname))[0]
+
+        metadata = search_song(query)
+        if not metadata:
+            return fname, False, "获取元信息失败"
+
+        tracks = get_album_tracks(metadata['albummid'])
+        track_number = find_track_number(tracks, metadata['songmid'], metadata['title'])
+        metadata['track'] = track_number if track_number > 0 else metadata.get('track', 1)
+
+        if config.lyrics:
+            from .lyrics import get_lyrics
+
+            # 复用已解析出的 songmid，歌词与其他标签一起写入
+            metadata['lyrics'] = get_lyrics(metadata['songmid'])
+
+        ok, err = write_tags(input_path, metadata)
+        if ok:
+            # 子目录中的文件在完成目录中保持相同的目录结构
+            output_path = unique_path(os.path.join(config.done_dir, fname))
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            shutil.move(input_path, output_path)
+            if dedup_keys:
+                from . import dedup
+
+                dedup.confirm(dedup_keys, os.path.relpath(output_path, config.done_dir))
+                dedup_keys = None
+            return fname, True, metadata
+        else:
+            return fname, False, err
+
+    except Exception as e:
+        return fname, False, f"处理异常: {e}"
+    finally:
+        if dedup_keys:
+            from . import dedup
+
+            dedup.release(dedup_keys)
+
+
+def scan_audio_files():
+    """流式扫描解密目录（含子目录），返回相对 raw_dir 的路径"""
+    from .scan import iter_files
+
+    for rel, _ in iter_files(config.raw_dir, config.audio_exts, recursive=config.recursive,
+                             workers=config.scan_workers, skip=(config.done_dir,)):
+        yield rel
+
+
+def process_all_music():
+    from .memory import over_limit, trim_caches
+    from .report import ReportWriter, default_report_path
+
+    os.makedirs(config.done_dir, exist_ok=True)
+    success_count, fail_count, duplicate_count = 0, 0, 0
+    failures = []  # 只保留前几条用于结尾展示，完整结果见报告文件
+    completed = queue.Queue()
+    window = config.max_inflight or config.max_workers * 4
+    report_file = ReportWriter(config.report_path or default_report_path())
+    deferred = []  # --dedup link 时原文件仍在处理中的重复文件，其余文件处理完后再链接
+
+    print(f"🎵 开始扫描并处理音频文件，使用 {config.max_workers} 个线程，最多 {window} 个任务排队...")
+    print(f"📝 处理结果写入: {report_file.path}")
+    start_time = time.time()
+
+    def report(i, total, fname, future, defer=True):
+        nonlocal success_count, fail_count, duplicate_count
+        try:
+            result = future.result()
+            fname, success, data = result
+            if defer and success and data.get('duplicate_state') == "pending" and config.dedup == "link":
+                deferred.append(fname)
+                print(f"[⏳] ({i}/{total}) 原文件仍在处理中，稍后链接：{fname}")
+                return
+            report_file.write(fname, success, data)
+
+            if success and data.get('duplicate_of'):
+                duplicate_count += 1
+                print(f"[♻️] ({i}/{total}) 重复文件：{fname} - {data['message']}")
+            elif success and isinstance(data, dict):
+                success_count += 1
+                print(f"[✅] ({i}/{total}) 已处理：{fname} (Track {data['track']})")
+                if data.get('cover_resolution'):
+                    print(f"    ↳ 封面分辨率：{data['cover_resolution']}")
+                elif data.get('cover_size') != "0":
+                    print(f"    ↳ 封面分辨率：{data.get('cover_size')}x{data.get('cover_size')}")
+                print("    ↳ 签名：Processed by 𝗣𝗔𝗡")
+            else:
+                fail_count += 1
+                if len(failures) < MAX_LISTED_FAILURES:
+                    failures.append((fname, data))
+                print(f"[❌] ({i}/{total}) 处理失败：{fname} - {data}")
+
+        except Exception as e:
+            fail_count += 1
+            report_file.write(fname, False, e)
+            if len(failures) < MAX_LISTED_FAILURES:
+                failures.append((fname, str(e)))
+            print(f"[❌] ({i}/{total}) 处理异常：{fname} - {e}")
+
+    total_files, done_files = 0, 0
+    try:
+        with ThreadPoolExecutor(max_workers=config.max_workers) as executor:
+            # 边扫描边提交；排队任务达到窗口上限时先等待结果，排队的任务数不超过窗口
+            for fname in scan_audio_files():
+                while total_files - done_files >= window:
+                    done_files += 1
+                    report(done_files, f"{total_files}+", *completed.get())
+
+                if total_files % 100 == 0 and over_limit(config.max_memory_mb):
+                    # 超出内存上限：等待排队任务全部完成并清空可重建的缓存
+                    print(f"⚠️ 内存占用超过 {config.max_memory_mb} MB，暂停提交并清理缓存")
+                    while done_files < total_files:
+                        done_files += 1
+                        report(done_files, f"{total_files}+", *completed.get())
+                    trim_caches()
+
+                future = executor.submit(process_single_file, fname)
+                future.add_done_callback(lambda f, name=fname: completed.put((name, f)))
+                total_files += 1
+                while not completed.empty():
+                    done_files += 1
+                    report(done_files, f"{total_files}+", *completed.get())
+
+            while done_files < total_files:
+                done_files += 1
+                report(done_files, total_files, *completed.get())
+
+            if deferred:
+                # 本次运行中的原文件都已处理完，重新登记即可链接；原文件失败时由本文件接手处理
+                print(f"🔗 重新处理 {len(deferred)} 个等待链接的重复文件")
+                for fname in deferred:
+                    future = executor.submit(process_single_file, fname)
+                    future.add_done_callback(lambda f, name=fname: completed.put((name, f)))
+                for i in range(1, len(deferred) + 1):
+                    report(i, len(deferred), *completed.get(), defer=False)
+    finally:
+        report_file.close()
+
+    if config.lyrics:
+        from .lyrics import close_lyrics_cache
+
+        close_lyrics_cache()
+
+    if total_files == 0:
+        print("❌ 没有找到可处理的音频文件")
+        return
+
+    end_time = time.time()
+    total_time = end_time - start_time
+
+    print("\n🎵 处理完成")
+    print(f"⏱️ 总耗时: {total_time:.2f}秒")
+    print(f"📊 平均每个文件: {total_time / total_files:.2f}秒")
+    print(f"✅ 成功: {success_count} 个")
+    print(f"❌ 失败: {fail_count} 个")
+    if duplicate_count:
+        print(f"♻️ 重复: {duplicate_count} 个")
+
+    if failures:
+        print("---- 失败详情 ----")
+        for fname, reason in failures:
+            print(f"  - {fname} ：{reason}")
+        if fail_count > len(failures):
+            print(f"  ……其余 {fail_count - len(failures)} 条见 {report_file.path}")